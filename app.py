@@ -1,6 +1,8 @@
 import os
 import json
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, Response
+from jinja2.utils import htmlsafe_json_dumps
+from markupsafe import Markup
 
 # Initialize the Flask application
 app = Flask(__name__)
@@ -8,10 +10,25 @@ app = Flask(__name__)
 #global dictionary to cache the matches
 matches = {}
 
+#global caches of the loaded users and the pre-encoded JSON of each content item
+users = []
+users_json = Markup('[]')
+content_fragments = {}
+users_by_name = {}
+content_by_tags = {}
+content_tag_keys = {}
+content_positions = {}
+
 # Configurable paths for user and content data
 app.config['USERS_FILE'] = 'data/users.json'
 app.config['CONTENT_FILE'] = 'data/content.json'
 
+# Number of matches sent per chunk by the streaming endpoints
+app.config['STREAM_BATCH_SIZE'] = 100
+
+# Number of scanned content items after which the streaming endpoints pause, even without matches
+app.config['STREAM_SCAN_BUDGET'] = 1000
+
 def load_json_data(file_path):
     """Loads JSON data from a specified file with error handling.
 
@@ -72,6 +89,40 @@ def load_users(file_path=None):
 
     return users
 
+def validate_content_item(item):
+    """Checks that a content item has all required fields and valid tags.
+
+    Args:
+        item (dict): A content dictionary.
+
+    Raises:
+        ValueError: If required fields are missing or if tags are invalid.
+    """
+    # Check for 'id'
+    if 'id' not in item or not item['id']:
+        raise ValueError(f"Content item missing 'id' or 'id' is empty: {item}")
+
+    # Check for 'title'
+    if 'title' not in item or not item['title']:
+        raise ValueError(f"Content item missing 'title' or 'title' is empty for content '{item.get('id', 'Unknown')}'")
+
+    # Check for 'content'
+    if 'content' not in item or not item['content']:
+        raise ValueError(f"Content item missing 'content' or 'content' is empty for content '{item.get('id', 'Unknown')}'")
+
+    # Check for 'tags'
+    if 'tags' not in item or not isinstance(item['tags'], list):
+        raise ValueError(f"Content item '{item['id']}' has invalid or missing 'tags'.")
+
+    # Validate each tag
+    for tag in item['tags']:
+        if 'type' not in tag or not tag['type']:
+            raise ValueError(f"Tag missing 'type' or 'type' is empty for content '{item['id']}'.")
+        if 'value' not in tag or not tag['value']:
+            raise ValueError(f"Tag missing 'value' or 'value' is empty for content '{item['id']}'.")
+        if 'threshold' not in tag or not isinstance(tag['threshold'], (int, float)):
+            raise ValueError(f"Tag missing 'threshold' or 'threshold' is not a number for content '{item['id']}'.")
+
 def load_content(file_path=None):
     """Loads content data from a JSON file.
 
@@ -91,36 +142,13 @@ def load_content(file_path=None):
 
     seen_ids = set()
     for item in content:
-        # Check for 'id'
-        if 'id' not in item or not item['id']:
-            raise ValueError(f"Content item missing 'id' or 'id' is empty: {item}")
-
-        # Check for 'title'
-        if 'title' not in item or not item['title']:
-            raise ValueError(f"Content item missing 'title' or 'title' is empty for content '{item.get('id', 'Unknown')}'")
-
-        # Check for 'content'
-        if 'content' not in item or not item['content']:
-            raise ValueError(f"Content item missing 'content' or 'content' is empty for content '{item.get('id', 'Unknown')}'")
+        validate_content_item(item)
 
         # Ensure 'id' is unique
         if item['id'] in seen_ids:
             raise ValueError(f"Duplicate content ID found: {item['id']}")
         seen_ids.add(item['id'])
 
-        # Check for 'tags'
-        if 'tags' not in item or not isinstance(item['tags'], list):
-            raise ValueError(f"Content item '{item['id']}' has invalid or missing 'tags'.")
-
-        # Validate each tag
-        for tag in item['tags']:
-            if 'type' not in tag or not tag['type']:
-                raise ValueError(f"Tag missing 'type' or 'type' is empty for content '{item['id']}'.")
-            if 'value' not in tag or not tag['value']:
-                raise ValueError(f"Tag missing 'value' or 'value' is empty for content '{item['id']}'.")
-            if 'threshold' not in tag or not isinstance(tag['threshold'], (int, float)):
-                raise ValueError(f"Tag missing 'threshold' or 'threshold' is not a number for content '{item['id']}'.")
-
     return content
 
 def index_content_by_tags(content):
@@ -141,6 +169,35 @@ def index_content_by_tags(content):
             content_by_tags[key].append(item)
     return content_by_tags
 
+def iter_user_matches(user, content_by_tags, scan_budget=None):
+    """Yields the content items matching a user's interests, straight from the inverted index.
+
+    Args:
+        user (dict): A user dictionary containing 'name' and 'interests'.
+        content_by_tags (dict): The inverted index built by `index_content_by_tags`.
+        scan_budget (int, optional): If given, `None` is also yielded after every `scan_budget`
+            scanned items, so streaming callers can pause during long runs of non-matching items.
+
+    Yields:
+        dict: Each matching content item, once, in match order (or `None`, see `scan_budget`).
+    """
+    seen_content_ids = set()
+    scanned = 0
+    for interest in user['interests']:
+        key = (interest['type'], interest['value'])
+        if key in content_by_tags:
+            for item in content_by_tags[key]:
+                scanned += 1
+                if scan_budget and scanned % scan_budget == 0:
+                    yield None
+                # Only proceed if this content item has not been yielded before
+                if item['id'] not in seen_content_ids:
+                    # Check if any tag's threshold meets the interest threshold
+                    if any(tag['threshold'] >= interest['threshold'] for tag in item['tags']
+                           if tag['type'] == interest['type'] and tag['value'] == interest['value']):
+                        seen_content_ids.add(item['id'])
+                        yield item
+
 def match_content_to_users(users, content):
     """Matches content to users based on their interests.
 
@@ -151,25 +208,162 @@ def match_content_to_users(users, content):
     Returns:
         dict: A dictionary mapping each user name to a list of matching content items.
     """
-    content_by_tags = index_content_by_tags(content)
-    matches = {user['name']: [] for user in users}
+    return match_users_from_index(users, index_content_by_tags(content))
 
+def match_users_from_index(users, content_by_tags):
+    """Matches users against an already built inverted index.
 
-    for user in users:
-        seen_content_ids = set()
-        for interest in user['interests']:
-            key = (interest['type'], interest['value'])
-            if key in content_by_tags:
-                for item in content_by_tags[key]:
-                   # Only proceed if this content item has not been added before
-                   if item['id'] not in seen_content_ids: 
-                        # Check if any tag's threshold meets the interest threshold
-                        if any(tag['threshold'] >= interest['threshold'] for tag in item['tags'] 
-                               if tag['type'] == interest['type'] and tag['value'] == interest['value']):
-                            matches[user['name']].append(item)
-                            seen_content_ids.add(item['id'])
+    Args:
+        users (list): A list of user dictionaries, each containing 'name' and 'interests'.
+        content_by_tags (dict): The inverted index built by `index_content_by_tags`.
+
+    Returns:
+        dict: A dictionary mapping each user name to a list of matching content items.
+    """
+    return {user['name']: list(iter_user_matches(user, content_by_tags)) for user in users}
+
+def encode_content_item(item):
+    """Encodes a content item to compact, HTML-safe UTF-8 JSON bytes.
+
+    The characters ``<``, ``>``, ``&`` and ``'`` are escaped, so the same bytes can be
+    served as a JSON response and embedded directly in the page's ``<script>`` block.
+
+    Args:
+        item (dict): A content dictionary.
+
+    Returns:
+        bytes: The encoded JSON fragment.
+    """
+    return htmlsafe_json_dumps(item, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+def index_content_fragments(content):
+    """Encodes every content item once so responses can be assembled from cached bytes.
+
+    Args:
+        content (list): A list of content dictionaries.
 
-    return matches
+    Returns:
+        dict: A dictionary mapping each content ID to its encoded JSON fragment.
+    """
+    return {item['id']: encode_content_item(item) for item in content}
+
+def update_content_item(item):
+    """Replaces a loaded content item and refreshes only the caches it affects.
+
+    The item's fragment is re-encoded, its old and new tag keys are re-indexed, and the matches
+    are recomputed for the users with an interest in one of those keys. All other fragments,
+    index entries and matches are left untouched.
+
+    The item may be a new dictionary or a loaded item edited in place.
+
+    Args:
+        item (dict): The changed content dictionary; its 'id' must belong to a loaded item.
+
+    Raises:
+        ValueError: If the item is invalid or its 'id' is unknown.
+    """
+    if not matches:
+        load_data()
+    validate_content_item(item)
+    if item['id'] not in content_tag_keys:
+        raise ValueError(f"Unknown content ID: {item['id']}")
+
+    # Take the old keys from the index rather than the old item, which the caller may have edited in place
+    old_keys = content_tag_keys[item['id']]
+    new_keys = {(tag['type'], tag['value']) for tag in item['tags']}
+    affected_keys = old_keys | new_keys
+    content_tag_keys[item['id']] = new_keys
+    content_fragments[item['id']] = encode_content_item(item)
+
+    # Re-index the affected keys, keeping each list in the original content order
+    for key in affected_keys:
+        tagged = [c for c in content_by_tags.get(key, []) if c['id'] != item['id']]
+        if key in new_keys:
+            tagged.append(item)
+            tagged.sort(key=lambda c: content_positions[c['id']])
+        if tagged:
+            content_by_tags[key] = tagged
+        else:
+            content_by_tags.pop(key, None)
+
+    affected_users = [user for user in users
+                      if any((interest['type'], interest['value']) in affected_keys
+                             for interest in user['interests'])]
+    matches.update(match_users_from_index(affected_users, content_by_tags))
+
+def assemble_content_list(items, fragments):
+    """Builds a JSON array from the pre-encoded fragments of the given content items.
+
+    Args:
+        items (list): A list of content dictionaries.
+        fragments (dict): A dictionary mapping content IDs to encoded JSON fragments.
+
+    Returns:
+        bytes: The encoded JSON array.
+    """
+    return b'[' + b','.join([fragments[item['id']] for item in items]) + b']'
+
+def iter_ndjson_chunks(items, fragments, batch_size):
+    """Yields NDJSON chunks built from the pre-encoded fragments of the given content items.
+
+    Items are consumed lazily, so a generator such as `iter_user_matches` is never materialized.
+    A `None` item flushes the current batch early, yielding an empty chunk if it has no items.
+
+    Args:
+        items (iterable): The content dictionaries to encode, optionally interleaved with `None`.
+        fragments (dict): A dictionary mapping content IDs to encoded JSON fragments.
+        batch_size (int): The number of items per chunk.
+
+    Yields:
+        bytes: Newline-terminated JSON fragments, at most `batch_size` items at a time.
+    """
+    batch = []
+    for item in items:
+        if item is None:
+            yield b'\n'.join(batch) + b'\n' if batch else b''
+            batch = []
+            continue
+        batch.append(fragments[item['id']])
+        if len(batch) >= batch_size:
+            yield b'\n'.join(batch) + b'\n'
+            batch = []
+    if batch:
+        yield b'\n'.join(batch) + b'\n'
+
+def stream_user_content(user_name):
+    """Streams a user's matches as NDJSON chunks without building the full match list.
+
+    The data must already be loaded, see `load_data`. A chunk is produced at least every
+    `STREAM_SCAN_BUDGET` scanned items, so a chunk may be empty when nothing matched in that span.
+
+    Args:
+        user_name (str): The name of the selected user.
+
+    Returns:
+        iterator: NDJSON chunks; empty if the user does not exist.
+    """
+    user = users_by_name.get(user_name)
+    if user is None:
+        return iter(())
+    return iter_ndjson_chunks(iter_user_matches(user, content_by_tags, app.config['STREAM_SCAN_BUDGET']),
+                              content_fragments, app.config['STREAM_BATCH_SIZE'])
+
+def load_data():
+    """Loads users and content, encodes the content fragments and caches the matches.
+
+    Use `update_content_item` to change a single item afterwards.
+    """
+    global matches, users, users_json, content_fragments, users_by_name, content_by_tags
+    global content_tag_keys, content_positions
+    users = load_users()
+    content = load_content()
+    users_json = htmlsafe_json_dumps(users)
+    users_by_name = {user['name']: user for user in users}
+    content_tag_keys = {item['id']: {(tag['type'], tag['value']) for tag in item['tags']} for item in content}
+    content_positions = {item['id']: position for position, item in enumerate(content)}
+    content_by_tags = index_content_by_tags(content)
+    content_fragments = index_content_fragments(content)
+    matches = match_users_from_index(users, content_by_tags)
 
 
 @app.route('/')
@@ -179,13 +373,15 @@ def index():
     Returns:
         str: Rendered HTML of the main page.
     """
-    global matches
     if not matches:
-        users = load_users()
-        content = load_content()
-        matches = match_content_to_users(users, content)
+        load_data()
+    matches_json = b'{' + b','.join([
+        htmlsafe_json_dumps(name).encode('utf-8') + b':' + assemble_content_list(items, content_fragments)
+        for name, items in matches.items()
+    ]) + b'}'
     first_user_with_content = next((user['name'] for user in users if matches[user['name']]), users[0]['name'])
-    return render_template('index.html', matches=matches, users=users, selected_user=first_user_with_content)
+    return render_template('index.html', matches_json=Markup(matches_json.decode('utf-8')),
+                           users_json=users_json, selected_user=first_user_with_content)
 
 
 @app.route('/user_content', methods=['GET'])
@@ -195,11 +391,8 @@ def user_content():
     Returns:
         Response: JSON response containing the content that matches the selected user's interests.
     """
-    global matches
     if not matches:
-        users = load_users()
-        content = load_content()
-        matches = match_content_to_users(users, content)
+        load_data()
     
     selected_user = request.args.get('user')
 
@@ -208,7 +401,24 @@ def user_content():
     else:
         user_matches = []
 
-    return jsonify(user_matches)
+    return Response(assemble_content_list(user_matches, content_fragments), mimetype='application/json')
+
+
+@app.route('/user_content/stream', methods=['GET'])
+def user_content_stream():
+    """Streams user-specific content as newline-delimited JSON (NDJSON).
+
+    Matches are read from the inverted index and sent in chunks as they are found, so very
+    large match lists are never held in memory as a whole. For many slow clients, serve
+    `asgi.py` instead, which handles this route on an asyncio event loop.
+
+    Returns:
+        Response: Streaming response with one content item per line.
+    """
+    if not matches:
+        load_data()
+
+    return Response(stream_user_content(request.args.get('user')), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,114 @@
+"""ASGI entry point for serving the Interest Matchmaker on an asyncio event loop.
+
+`/user_content/stream` is handled natively: each open stream is a coroutine, so many slow
+clients can be held open without tying up a worker thread each. All other routes are
+delegated to the Flask application through asgiref's WSGI adapter.
+
+Run from the project root:
+
+    uvicorn asgi:application
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as matchmaker
+
+STREAM_PATH = '/user_content/stream'
+
+flask_application = WsgiToAsgi(matchmaker.app)
+
+data_lock = asyncio.Lock()
+
+
+async def ensure_data_loaded():
+    """Loads the data in a worker thread if it has not been loaded yet.
+
+    Parsing the data files is blocking, so it is kept off the event loop. This covers servers
+    run without lifespan events (e.g. `uvicorn --lifespan off`) and a failed startup load.
+    """
+    async with data_lock:
+        if not matchmaker.matches:
+            await asyncio.to_thread(matchmaker.load_data)
+
+
+async def lifespan(receive, send):
+    """Loads the data once at startup so the first request does not block the event loop.
+
+    Args:
+        receive (callable): The ASGI receive channel.
+        send (callable): The ASGI send channel.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await ensure_data_loaded()
+            except (FileNotFoundError, ValueError) as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def stream_user_content(scope, receive, send):
+    """Streams a user's matches as NDJSON, yielding to the event loop between chunks.
+
+    `send` only suspends when the transport is write-paused, so the stream explicitly yields
+    after every chunk. Chunks are produced at least every `STREAM_SCAN_BUDGET` scanned items,
+    even when nothing matched, so a long run of non-matching items does not hold the loop.
+    This lets other connections run and lets the disconnect watcher see `http.disconnect`;
+    streaming stops as soon as the client disconnects.
+
+    Args:
+        scope (dict): The ASGI connection scope.
+        receive (callable): The ASGI receive channel.
+        send (callable): The ASGI send channel.
+    """
+    await ensure_data_loaded()
+
+    query = parse_qs(scope['query_string'].decode('latin-1'))
+    selected_user = query.get('user', [None])[0]
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'application/x-ndjson')],
+        })
+        for chunk in matchmaker.stream_user_content(selected_user):
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await asyncio.sleep(0)
+            if disconnected.is_set():
+                return
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        watcher.cancel()
+
+
+async def application(scope, receive, send):
+    """The ASGI application callable.
+
+    Args:
+        scope (dict): The ASGI connection scope.
+        receive (callable): The ASGI receive channel.
+        send (callable): The ASGI send channel.
+    """
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+    elif scope['type'] == 'http' and scope['path'] == STREAM_PATH and scope['method'] == 'GET':
+        await stream_user_content(scope, receive, send)
+    else:
+        await flask_application(scope, receive, send)
@@ -0,0 +1,72 @@
+"""Compares `/user_content` serialization with `jsonify` against pre-encoded fragments.
+
+Run from the project root:
+
+    python benchmarks/bench_serialization.py
+
+For every user in the sample data it measures the time and the peak memory
+allocated to serialize that user's matches, once by re-encoding the content
+dicts with `jsonify` and once by joining the fragments built at index time. Both
+sides build a full Flask `Response`, as the `/user_content` route does.
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Response, jsonify
+from app import (app, load_users, load_content, match_content_to_users,
+                 index_content_fragments, assemble_content_list)
+
+REPEAT = 200
+
+
+def peak_allocation(func, args):
+    """Measures the peak memory allocated while serializing a single response.
+
+    Args:
+        func (callable): The serializer to measure.
+        args (list): The per-request arguments, one call is measured for each.
+
+    Returns:
+        float: The mean peak of traced memory per call, in bytes.
+    """
+    peaks = []
+    tracemalloc.start()
+    for arg in args:
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - start)
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def main():
+    users = load_users()
+    content = load_content()
+    matches = match_content_to_users(users, content)
+    fragments = index_content_fragments(content)
+    user_matches = [matches[user['name']] for user in users]
+
+    def with_jsonify(items):
+        return jsonify(items).get_data()
+
+    def with_fragments(items):
+        return Response(assemble_content_list(items, fragments), mimetype='application/json').get_data()
+
+    with app.app_context():
+        total_items = sum(len(items) for items in user_matches)
+        print(f"{len(users)} requests, {total_items} matched items per round, {REPEAT} rounds")
+        for label, func in (('jsonify', with_jsonify), ('fragments', with_fragments)):
+            seconds = timeit.timeit(lambda: [func(items) for items in user_matches], number=REPEAT)
+            seconds /= REPEAT * len(users)
+            peak = peak_allocation(func, user_matches)
+            print(f"{label:>10}: {seconds * 1e6:8.1f} us/request, {peak / 1024:8.1f} KiB peak allocation/request")
+
+
+if __name__ == '__main__':
+    main()
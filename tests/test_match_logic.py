@@ -1,7 +1,11 @@
 import pytest
 import os
 import json
-from app import app, load_users, load_content, match_content_to_users
+import asyncio
+import app as app_module
+from app import (app, load_users, load_content, match_content_to_users, encode_content_item,
+                 index_content_fragments, update_content_item, assemble_content_list,
+                 iter_ndjson_chunks)
 
 # Add the project root directory to the Python path to ensure imports work correctly.
 import sys
@@ -206,6 +210,159 @@ def test_match_content_to_users(test_data):
     bob_smith_ids = {content['id'] for content in matches["Bob Smith"]}
     assert bob_smith_ids == {"125", "126"}, "Bob Smith's matching content IDs should be '125' and '126'."
 
+def test_user_content_stream_route(test_client, test_data):
+    """Test the streaming route returns one JSON content item per line.
+
+    Args:
+        test_client (FlaskClient): The Flask test client provided by the fixture.
+        test_data (tuple): The test data file paths provided by the fixture.
+    """
+    response = test_client.get('/user_content/stream', query_string={'user': 'Bob Smith'})
+    assert response.status_code == 200, "Streaming route should return a 200 status code."
+    assert response.mimetype == 'application/x-ndjson', "Stream should be served as NDJSON."
+    data = [json.loads(line) for line in response.data.splitlines()]
+    expected = match_content_to_users(load_users(), load_content())['Bob Smith']
+    assert data == expected, "Streamed items should match the matching logic, in order."
+
+def test_user_content_stream_route_missing_user(test_client, test_data):
+    """Test the streaming route returns an empty body for a user that does not exist.
+
+    Args:
+        test_client (FlaskClient): The Flask test client provided by the fixture.
+        test_data (tuple): The test data file paths provided by the fixture.
+    """
+    response = test_client.get('/user_content/stream', query_string={'user': 'Nonexistent User'})
+    assert response.status_code == 200, "Streaming route should return a 200 status code."
+    assert response.data == b'', "Nonexistent User should have an empty stream."
+
+def test_iter_ndjson_chunks_batches_items():
+    """Test that NDJSON chunks hold at most `batch_size` items and consume items lazily."""
+    content = [{"id": str(i), "title": "Title", "content": "Content", "tags": []} for i in range(5)]
+    fragments = index_content_fragments(content)
+    chunks = list(iter_ndjson_chunks(iter(content), fragments, 2))
+    assert [chunk.count(b'\n') for chunk in chunks] == [2, 2, 1], "Items should be sent in batches of two."
+    assert [json.loads(line) for line in b''.join(chunks).splitlines()] == content
+
+def test_iter_ndjson_chunks_flushes_on_scan_budget():
+    """Test that a `None` marker flushes the current batch, even when it is empty."""
+    content = [{"id": str(i), "title": "Title", "content": "Content", "tags": []} for i in range(3)]
+    fragments = index_content_fragments(content)
+    chunks = list(iter_ndjson_chunks([content[0], None, None, content[1], content[2]], fragments, 5))
+    assert [chunk.count(b'\n') for chunk in chunks] == [1, 0, 2], "Markers should flush early, yielding b'' when empty."
+
+def test_asgi_user_content_stream(test_data, monkeypatch):
+    """Test the ASGI application streams matches as several body messages.
+
+    Args:
+        test_data (tuple): The test data file paths provided by the fixture.
+        monkeypatch (MonkeyPatch): Used to shrink the stream batch size for the test.
+    """
+    pytest.importorskip("asgiref", reason="the ASGI server needs asgiref")
+    import asgi
+    scope = {'type': 'http', 'method': 'GET', 'path': '/user_content/stream',
+             'query_string': b'user=Bob+Smith', 'headers': []}
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()  # the client stays connected
+
+    async def send(message):
+        sent.append(message)
+
+    monkeypatch.setitem(app.config, 'STREAM_BATCH_SIZE', 1)
+    asyncio.run(asgi.application(scope, receive, send))
+
+    assert sent[0]['status'] == 200, "Stream should start with a 200 status code."
+    bodies = [message['body'] for message in sent[1:]]
+    assert len(bodies) == 3, "Each match should be sent in its own chunk, followed by the final message."
+    assert {json.loads(line)['id'] for line in b''.join(bodies).splitlines()} == {"125", "126"}
+
+def test_asgi_user_content_stream_stops_on_disconnect(test_data, monkeypatch):
+    """Test the ASGI stream stops sending once the client disconnects after the first chunk.
+
+    Args:
+        test_data (tuple): The test data file paths provided by the fixture.
+        monkeypatch (MonkeyPatch): Used to shrink the stream batch size for the test.
+    """
+    pytest.importorskip("asgiref", reason="the ASGI server needs asgiref")
+    import asgi
+    scope = {'type': 'http', 'method': 'GET', 'path': '/user_content/stream',
+             'query_string': b'user=Bob+Smith', 'headers': []}
+    sent = []
+
+    async def receive():
+        # Disconnect as soon as the first chunk has been sent
+        while not any(message.get('body') for message in sent):
+            await asyncio.sleep(0)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    monkeypatch.setitem(app.config, 'STREAM_BATCH_SIZE', 1)
+    asyncio.run(asgi.application(scope, receive, send))
+
+    bodies = [message['body'] for message in sent[1:]]
+    assert len(bodies) == 1, "No body messages should be sent after the client disconnects."
+
+def test_asgi_user_content_stream_yields_while_scanning(test_data, monkeypatch):
+    """Test the ASGI stream yields and sees a disconnect while scanning items that do not match.
+
+    Args:
+        test_data (tuple): The test data file paths provided by the fixture.
+        monkeypatch (MonkeyPatch): Used to shrink the stream scan budget for the test.
+    """
+    pytest.importorskip("asgiref", reason="the ASGI server needs asgiref")
+    import asgi
+    scope = {'type': 'http', 'method': 'GET', 'path': '/user_content/stream',
+             'query_string': b'user=Alice+Johnson', 'headers': []}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    # Alice Johnson's only candidate item fails the threshold, so no chunk ever holds a match
+    monkeypatch.setitem(app.config, 'STREAM_SCAN_BUDGET', 1)
+    asyncio.run(asgi.application(scope, receive, send))
+
+    assert [message['type'] for message in sent] == ['http.response.start'], \
+        "Empty chunks should not be sent, and the stream should stop before its final message."
+
+def test_asgi_user_content_streams_interleave(test_data, monkeypatch):
+    """Test that two concurrent ASGI streams take turns on the event loop.
+
+    Args:
+        test_data (tuple): The test data file paths provided by the fixture.
+        monkeypatch (MonkeyPatch): Used to shrink the stream batch size for the test.
+    """
+    pytest.importorskip("asgiref", reason="the ASGI server needs asgiref")
+    import asgi
+    app_module.load_data()
+    sent = []
+
+    async def receive():
+        await asyncio.Event().wait()  # the client stays connected
+
+    def stream(name):
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                sent.append(name)
+        scope = {'type': 'http', 'method': 'GET', 'path': '/user_content/stream',
+                 'query_string': b'user=Bob+Smith', 'headers': []}
+        return asgi.application(scope, receive, send)
+
+    async def run_both():
+        await asyncio.gather(stream('first'), stream('second'))
+
+    monkeypatch.setitem(app.config, 'STREAM_BATCH_SIZE', 1)
+    asyncio.run(run_both())
+
+    assert sent.index('second') < len(sent) - 1 - sent[::-1].index('first'), \
+        "The second stream should send a chunk before the first stream finishes."
+
 def test_error_handling_missing_user(test_client, test_data):
     """Test the error handling for a user that does not exist.
 
@@ -237,3 +394,87 @@ def test_error_handling_invalid_route(test_client):
     """
     response = test_client.get('/invalid_route')
     assert response.status_code == 404, "Invalid route should return a 404 status code."
+
+def test_user_content_route_matches_item_encoding(test_client, test_data):
+    """Test that the assembled response decodes to the same items as the matching logic.
+
+    Args:
+        test_client (FlaskClient): The Flask test client provided by the fixture.
+        test_data (tuple): The test data file paths provided by the fixture.
+    """
+    response = test_client.get('/user_content', query_string={'user': 'Bob Smith'})
+    assert response.mimetype == 'application/json', "Response should be served as JSON."
+    expected = match_content_to_users(load_users(), load_content())['Bob Smith']
+    assert json.loads(response.data) == expected, "Assembled fragments should decode to the matched items."
+
+def test_content_fragments_are_html_safe():
+    """Test that encoded fragments escape characters that could close the page's script block."""
+    item = {"id": "1", "title": "</script><b>", "content": "Tom & Jerry's", "tags": []}
+    fragment = encode_content_item(item)
+    assert b'<' not in fragment and b'>' not in fragment and b'&' not in fragment and b"'" not in fragment
+    assert json.loads(fragment) == item, "Escaped fragment should decode to the original item."
+
+def test_assemble_content_list_joins_fragments():
+    """Test that fragments are joined into a JSON array without stray separators."""
+    content = [
+        {"id": "1", "title": "One", "content": "First", "tags": []},
+        {"id": "2", "title": "Two", "content": "Second", "tags": []}
+    ]
+    fragments = index_content_fragments(content)
+    assert assemble_content_list([], fragments) == b'[]', "No items should give an empty array."
+    assert assemble_content_list(content[:1], fragments) == b'[' + fragments["1"] + b']', \
+        "A single item should have no trailing comma."
+    assert json.loads(assemble_content_list(content, fragments)) == content
+
+def test_update_content_item_refreshes_affected_caches(test_client, test_data):
+    """Test that updating an item re-indexes its tags and re-matches only the affected users.
+
+    Args:
+        test_client (FlaskClient): The Flask test client provided by the fixture.
+        test_data (tuple): The test data file paths provided by the fixture.
+    """
+    app_module.load_data()
+    untouched = app_module.content_fragments["123"]
+    john_doe_matches = app_module.matches["John Doe"]
+    try:
+        # Raise the art tag's threshold so that Alice Johnson's interest is met
+        update_content_item({"id": "124", "title": "Art Exhibition", "content": "Modern art trends",
+                             "tags": [{"type": "topic", "value": "art", "threshold": 0.7}]})
+
+        response = test_client.get('/user_content', query_string={'user': 'Alice Johnson'})
+        assert [content['id'] for content in json.loads(response.data)] == ["124"]
+        assert app_module.content_fragments["123"] is untouched, "Unchanged fragments should be reused."
+        assert app_module.matches["John Doe"] is john_doe_matches, "Unaffected users should not be re-matched."
+
+        # Move the item to a tag nobody is interested in
+        update_content_item({"id": "124", "title": "Art Exhibition", "content": "Modern art trends",
+                             "tags": [{"type": "topic", "value": "music", "threshold": 0.7}]})
+        assert app_module.matches["Alice Johnson"] == [], "Alice Johnson should lose the re-tagged item."
+        assert ("topic", "art") not in app_module.content_by_tags, "Empty index entries should be removed."
+
+        with pytest.raises(ValueError):
+            update_content_item({"id": "999", "title": "Unknown", "content": "Unknown", "tags": []})
+    finally:
+        app_module.load_data()
+
+def test_update_content_item_edited_in_place(test_client, test_data):
+    """Test that a loaded item edited in place is removed from its old tags and re-matched.
+
+    Args:
+        test_client (FlaskClient): The Flask test client provided by the fixture.
+        test_data (tuple): The test data file paths provided by the fixture.
+    """
+    app_module.load_data()
+    try:
+        item = next(c for c in app_module.content_by_tags[("topic", "sports")] if c['id'] == "125")
+        item['tags'] = [{"type": "topic", "value": "music", "threshold": 0.6}]
+        update_content_item(item)
+
+        assert [c['id'] for c in app_module.content_by_tags[("topic", "sports")]] == ["126"]
+        response = test_client.get('/user_content', query_string={'user': 'Bob Smith'})
+        assert [content['id'] for content in json.loads(response.data)] == ["126"]
+        response = test_client.get('/user_content/stream', query_string={'user': 'Bob Smith'})
+        assert [json.loads(line)['id'] for line in response.data.splitlines()] == ["126"], \
+            "The streaming route should agree with the cached matches."
+    finally:
+        app_module.load_data()